@@ -12,9 +12,9 @@
 5. 支持音频预览和下载
 
 使用方法:
-1. 确保已安装所有依赖库，包括 streamlit、edge_tts、pydub、requests、bs4、aiohttp 等。
+1. 确保已安装所有依赖库，包括 streamlit、edge_tts、bs4、aiohttp 等。
    可以使用以下命令安装:
-   pip install streamlit edge_tts pydub requests bs4 aiohttp openai
+   pip install streamlit edge_tts bs4 aiohttp openai
 
 2. 运行程序:
    streamlit run podgenUI.py
@@ -35,21 +35,47 @@
 - Streamlit
 - Microsoft Edge TTS
 - OpenAI API (可选)
-- 其他 Python 库如 pydub、requests 等
+- 其他 Python 库如 aiohttp、bs4 等
 """
 
 import os
 import edge_tts
-from pydub import AudioSegment
 import streamlit as st
 import asyncio
-import tempfile
+import io
 import openai
+import httpx
 import configparser
-import json
-import requests
+import aiohttp
 from bs4 import BeautifulSoup, Tag
+from bs4.element import CData, NavigableString
 import re
+import threading
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml  # noqa: F401
+    BS4_PARSER = 'lxml'
+except ImportError:
+    BS4_PARSER = 'html.parser'
+
+# aiohttp只有在安装了brotli时才能解码br压缩的响应
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Encoding': ACCEPT_ENCODING
+}
 
 def load_config():
     """从配置文件加载GPT设置"""
@@ -85,6 +111,13 @@ def save_config(settings):
     with open('podgenUI.ini', 'w') as configfile:
         config.write(configfile)
 
+def maybe_save_config(settings):
+    """仅当设置与上次保存的内容不同时才写入配置文件"""
+    if st.session_state.get('_saved_config') == settings:
+        return
+    save_config(settings)
+    st.session_state._saved_config = settings
+
 # 加载配置
 config_settings = load_config()
 
@@ -101,59 +134,311 @@ if 'system_prompt' not in st.session_state:
     st.session_state.system_prompt = config_settings['system_prompt']
 if 'text_content' not in st.session_state:
     st.session_state.text_content = ""
+if '_saved_config' not in st.session_state:
+    st.session_state._saved_config = config_settings
+if '_config_dirty' not in st.session_state:
+    st.session_state._config_dirty = False
+
 
 
+# 发送给GPT的每段文本的目标长度（字符数）
+GPT_CHUNK_SIZE = 2000
+# 同时进行的GPT请求数和Edge TTS连接数上限
+GPT_CONCURRENCY = 4
+TTS_CONCURRENCY = 4
 
-def process_text_with_gpt(text, api_key, model_name, base_url):
-    """使用GPT处理文本，生成标题和正文格式"""
+def split_text(text, chunk_size=GPT_CHUNK_SIZE):
+    """按段落边界将文本切分为长度约为chunk_size的若干段"""
+    chunks = []
+    current = []
+    current_len = 0
+    for paragraph in text.split('\n\n'):
+        if not paragraph.strip():  # 跳过空段落，避免向GPT发送空内容
+            continue
+        if current and current_len + len(paragraph) > chunk_size:
+            chunks.append('\n\n'.join(current))
+            current = []
+            current_len = 0
+        current.append(paragraph)
+        current_len += len(paragraph) + 2
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
+
+async def process_chunk_with_gpt(client, chunk, model_name, system_prompt):
+    """使用GPT处理单段文本"""
+    response = await client.chat.completions.create(
+        model=model_name,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": chunk}
+        ]
+    )
+    content = response.choices[0].message.content
+    if not content:
+        raise ValueError("GPT返回了空内容")
+    return content
+
+async def gather_or_cancel(coros):
+    """并发执行协程，结果保持原有顺序；任一协程失败时取消其余协程后再抛出异常"""
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
     try:
-        client = openai.OpenAI(
-            api_key=api_key,
-            base_url=base_url
-        )
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "system", "content": st.session_state.system_prompt},
-                {"role": "user", "content": text}
-            ]
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+@st.cache_resource
+def get_event_loop():
+    """获取在后台线程中持续运行的事件循环
+
+    缓存的异步客户端绑定在创建连接时的事件循环上，因此需要跨rerun复用同一个循环。
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+def run_async(coro):
+    """在后台事件循环中执行协程并等待结果"""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
+
+@st.cache_resource
+def get_openai_client(api_key, base_url):
+    """按(api_key, base_url)缓存OpenAI客户端，跨rerun复用其连接池"""
+    return openai.AsyncOpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=16, max_keepalive_connections=8),
+            timeout=60.0
         )
-        return response.choices[0].message.content
-    except Exception as e:
-        st.error(f"GPT处理失败: {str(e)}")
-        return text
+    )
+
+async def process_chunks_with_gpt(client, chunks, model_name, system_prompt):
+    """并发处理所有文本段，结果保持原有顺序"""
+    semaphore = asyncio.Semaphore(GPT_CONCURRENCY)
+
+    async def process_chunk(chunk):
+        async with semaphore:
+            return await process_chunk_with_gpt(client, chunk, model_name, system_prompt)
+
+    return await gather_or_cancel([process_chunk(chunk) for chunk in chunks])
+
+@st.cache_data(show_spinner=False)
+def process_text_with_gpt(text, api_key, model_name, base_url, system_prompt):
+    """使用GPT处理文本，生成标题和正文格式
+
+    长文本按段落切分后并发处理。结果按参数缓存，失败时抛出异常（异常不会被缓存）。
+    """
+    client = get_openai_client(api_key, base_url)
+    chunks = split_text(text)
+    parts = run_async(process_chunks_with_gpt(client, chunks, model_name, system_prompt))
+    return '\n\n'.join(parts)
+
+async def synthesize_audio(text, voice_id):
+    """使用Edge TTS合成语音，直接在内存中返回MP3数据"""
+    tts = edge_tts.Communicate(text, voice_id, rate='+25%')
+    buf = io.BytesIO()
+    async for chunk in tts.stream():
+        if chunk["type"] == "audio":
+            buf.write(chunk["data"])
+    return buf.getvalue()
 
 async def generate_audio(text, voice_id, progress_placeholder):
-    """生成音频文件"""
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_file:
-        progress_placeholder.text("生成音频中...")
-        tts = edge_tts.Communicate(text, voice_id, rate='+25%')
-        await tts.save(temp_file.name)
-        progress_placeholder.text("音频生成完毕！")
-        return temp_file.name
+    """生成音频，直接在内存中返回MP3数据"""
+    progress_placeholder.text("生成音频中...")
+    audio_bytes = await synthesize_audio(text, voice_id)
+    progress_placeholder.text("音频生成完毕！")
+    return audio_bytes
+
+async def process_and_generate_audio(client, text, voice_id, model_name, system_prompt):
+    """GPT整理与语音合成流水线
+
+    每段文本整理完成后立即开始合成语音，与其余文本段的GPT请求并行进行。
+    GPT请求和TTS连接的并发数分别受限，任一文本段失败时取消其余文本段。
+    Edge TTS输出的MP3可以直接拼接。返回 (整理后的文本, MP3数据)。
+    """
+    gpt_semaphore = asyncio.Semaphore(GPT_CONCURRENCY)
+    tts_semaphore = asyncio.Semaphore(TTS_CONCURRENCY)
+
+    async def process_chunk(chunk):
+        async with gpt_semaphore:
+            processed = await process_chunk_with_gpt(client, chunk, model_name, system_prompt)
+        async with tts_semaphore:
+            return processed, await synthesize_audio(processed, voice_id)
+
+    results = await gather_or_cancel([process_chunk(chunk) for chunk in split_text(text)])
+    processed_text = '\n\n'.join(processed for processed, _ in results)
+    audio_bytes = b''.join(audio for _, audio in results)
+    return processed_text, audio_bytes
+
+def show_audio(audio_bytes):
+    """显示音频预览和下载按钮"""
+    st.audio(audio_bytes, format='audio/mp3')
+    st.download_button(
+        label="下载MP3",
+        data=audio_bytes,
+        file_name="generated_audio.mp3",
+        mime="audio/mpeg"
+    )
+
+# 解析网页时需要移除的元素及需要提取的标题元素
+REMOVED_TAGS = ["script", "style", "meta", "link", "noscript", "header", "footer", "nav", "aside"]
+# BeautifulSoup的get_text不包含这些元素中的文本（注音和模板内容），selectolax需显式移除
+NON_TEXT_TAGS = ["rt", "rp", "template"]
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+BLOCK_TAGS = HEADING_TAGS + ['p']
+_BLOCK_SELECTOR = ','.join(BLOCK_TAGS)
+_BLOCK_AND_DIV_SELECTOR = ','.join(BLOCK_TAGS + ['div'])
+
+# 清理提取文本时使用的正则表达式
+_RE_BLANK = re.compile(r'\n\s*\n')
+_RE_TRIPLE = re.compile(r'\n\n\n+')
+
+def parse_html_with_selectolax(html):
+    """使用selectolax(lexbor)解析HTML
+
+    返回 (网页标题, [(是否为标题元素, 文本), ...], [div文本, ...])
+    结果与parse_html_with_bs4基本一致，已知差异：
+    - lexbor按HTML5规范把CDATA段当作注释处理，其中的文本不会被提取
+    - 模板中含有段落/标题元素的div，因模板被移除而会被当作纯文本div
+    - 嵌套不合法的HTML（如<p>中的<div>）按HTML5规范重新组织，结构可能与html.parser不同
+    """
+    tree = LexborHTMLParser(html)
+    
+    # 移除script、style和其他不需要的元素，以及注音、模板等非正文元素
+    for node in tree.css(','.join(REMOVED_TAGS + NON_TEXT_TAGS)):
+        node.decompose()
+    
+    # 处理标题
+    title_node = tree.css_first('title')
+    title = title_node.text(strip=True) if title_node else ""
+    
+    # 首先处理主要内容区域（如果存在）
+    main_content = tree.css_first('main, article') or tree.root
+    if main_content is None:
+        return title, [], []
+    
+    # 一次遍历同时收集段落、标题元素和div
+    blocks = []
+    divs = []
+    for node in main_content.css(_BLOCK_AND_DIV_SELECTOR):
+        if node.tag == 'div':
+            # 只处理直接包含文本的div，避免处理包含其他元素的div
+            if node.css_first(_BLOCK_SELECTOR) is None:
+                divs.append(node.text(strip=True))
+        else:
+            blocks.append((node.tag in HEADING_TAGS, node.text(strip=True)))
+    
+    return title, blocks, divs
+
+def parse_html_with_bs4(html):
+    """使用BeautifulSoup解析HTML（未安装selectolax时使用），返回值同parse_html_with_selectolax"""
+    soup = BeautifulSoup(html, BS4_PARSER)
+    
+    # 移除script、style和其他不需要的元素
+    for element in soup(REMOVED_TAGS):
+        element.decompose()
+    
+    # 处理标题
+    if soup.title and soup.title.string:
+        title = soup.title.string.strip()
+    else:
+        title = ""
+    
+    # 首先处理主要内容区域（如果存在）
+    main_content = soup.find(['main', 'article']) or soup
+    
+    # 一次遍历同时收集段落、标题元素和div
+    blocks, divs = collect_text_blocks(main_content)
+    
+    return title, blocks, divs
+
+@dataclass
+class _TextFrame:
+    """collect_text_blocks遍历栈中的一项"""
+    element: Tag
+    children: Iterator  # 尚未访问的子节点
+    start: int  # 进入元素时已收集的文本节点数
+    slot: Optional[int]  # 元素在blocks或divs中的占位下标
+    has_block: bool = False  # 子树中是否包含标题/段落元素
+
+def collect_text_blocks(main_content):
+    """一次线性遍历收集标题/段落元素和div的文本
+
+    结果等价于对每个元素调用get_text(strip=True)，但整棵树只遍历一次：
+    元素的文本就是其子树中文本节点在文档顺序中连续的一段，退出元素时直接拼接即可。
+    返回 ([(是否为标题元素, 文本), ...], [div文本, ...])，均按文档顺序排列。
+    """
+    strings = []  # 去除首尾空白后的非空文本节点，按文档顺序排列
+    blocks = []
+    divs = []
+    stack = [_TextFrame(main_content, iter(main_content.contents), 0, None)]
+    while stack:
+        frame = stack[-1]
+        child = next(frame.children, None)
+        if child is None:
+            # 退出元素
+            stack.pop()
+            name = frame.element.name
+            if name in BLOCK_TAGS:
+                blocks[frame.slot] = (name in HEADING_TAGS, ''.join(strings[frame.start:]))
+            elif frame.slot is not None and not frame.has_block:
+                # 只处理直接包含文本的div，避免处理包含其他元素的div
+                divs[frame.slot] = ''.join(strings[frame.start:])
+            if stack and (frame.has_block or name in BLOCK_TAGS):
+                stack[-1].has_block = True
+        elif isinstance(child, Tag):
+            # 进入元素，先占位以保持文档顺序
+            slot = None
+            if child.name in BLOCK_TAGS:
+                slot = len(blocks)
+                blocks.append(None)
+            elif child.name == 'div':
+                slot = len(divs)
+                divs.append(None)
+            stack.append(_TextFrame(child, iter(child.contents), len(strings), slot))
+        elif type(child) in (NavigableString, CData):
+            # 与get_text一致，只收集正文字符串，跳过注释以及<rt>、<rp>、<template>等中的字符串
+            text = child.strip()
+            if text:
+                strings.append(text)
+    
+    return blocks, [text for text in divs if text is not None]
+
+async def create_http_session():
+    """创建HTTP会话（需在事件循环中调用）"""
+    return aiohttp.ClientSession(
+        headers=HTTP_HEADERS,
+        connector=aiohttp.TCPConnector(limit=32),
+        timeout=aiohttp.ClientTimeout(total=10)
+    )
+
+@st.cache_resource
+def get_http_session():
+    """获取在后台事件循环中复用的HTTP会话，避免每次获取网页都重新建立TCP/TLS连接"""
+    return run_async(create_http_session())
+
+async def fetch_html(session, url):
+    """异步获取网页HTML"""
+    async with session.get(url) as response:
+        response.raise_for_status()  # 检查请求是否成功
+        return await response.text(errors='replace')
 
+@st.cache_data(ttl=3600, show_spinner=False)
 def extract_text_from_url(url):
     """从URL获取网页内容并提取文本"""
     try:
         # 发送HTTP请求
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()  # 检查请求是否成功
-        
-        # 使用BeautifulSoup解析HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
+        html = run_async(fetch_html(get_http_session(), url))
         
-        # 移除script、style和其他不需要的元素
-        for element in soup(["script", "style", "meta", "link", "noscript", "header", "footer", "nav", "aside"]):
-            element.decompose()
-        
-        # 处理标题
-        if soup.title and soup.title.string:
-            title = soup.title.string.strip()
+        # 解析HTML，优先使用基于C的selectolax
+        if LexborHTMLParser is not None:
+            title, blocks, divs = parse_html_with_selectolax(html)
         else:
-            title = ""
+            title, blocks, divs = parse_html_with_bs4(html)
         
         # 处理正文内容
         content_parts = []
@@ -161,45 +446,36 @@ def extract_text_from_url(url):
         
         # 添加标题
         if title:
-            content_parts.append(title + "\n\n")
+            content_parts.extend((title, "\n\n"))
             processed_text.add(title)
         
-        # 首先处理主要内容区域（如果存在）
-        main_content = soup.find(['main', 'article']) or soup
-        
         # 处理段落和其他文本元素
-        for element in main_content.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p'], recursive=True):
-            if hasattr(element, 'get_text'):
-                text = element.get_text(strip=True)
-                if text and text not in processed_text:  # 只处理非空且未处理过的文本
-                    processed_text.add(text)
-                    # 对于标题元素添加额外的换行
-                    if hasattr(element, 'name') and element.name.startswith('h'):
-                        content_parts.append("\n" + text + "\n")
-                    # 对于段落添加适当的间距
-                    else:
-                        content_parts.append(text + "\n\n")
+        for is_heading, text in blocks:
+            if text and text not in processed_text:  # 只处理非空且未处理过的文本
+                processed_text.add(text)
+                # 对于标题元素添加额外的换行
+                if is_heading:
+                    content_parts.extend(("\n", text, "\n"))
+                # 对于段落添加适当的间距
+                else:
+                    content_parts.extend((text, "\n\n"))
         
         # 处理可能的其他有意义的div内容
-        for element in main_content.find_all('div', recursive=True):
-            # 只处理直接包含文本的div，避免处理包含其他元素的div
-            if hasattr(element, 'find') and isinstance(element, Tag):
-                if element.find(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']) is None and hasattr(element, 'get_text'):
-                    text = element.get_text(strip=True)
-                    if text and len(text) > 50 and text not in processed_text:  # 只处理长度超过50的文本
-                        processed_text.add(text)
-                        content_parts.append(text + "\n\n")
+        for text in divs:
+            if len(text) > 50 and text not in processed_text:  # 只处理长度超过50的文本
+                processed_text.add(text)
+                content_parts.extend((text, "\n\n"))
         
         # 合并所有内容
         text = ''.join(content_parts)
         
         # 清理多余的空行和空格
         # 将连续的多个空行替换为两个空行
-        text = re.sub(r'\n\s*\n', '\n\n', text)
+        text = _RE_BLANK.sub('\n\n', text)
         # 删除行首和行尾的空格
         text = '\n'.join(line.strip() for line in text.split('\n'))
         # 确保段落之间有适当的间距
-        text = re.sub(r'\n\n\n+', '\n\n', text)
+        text = _RE_TRIPLE.sub('\n\n', text)
         
         return text.strip()
     except Exception as e:
@@ -213,13 +489,7 @@ st.sidebar.title("GPT设置")
 use_gpt = st.sidebar.checkbox("使用GPT处理文本", value=st.session_state.use_gpt)
 if use_gpt != st.session_state.use_gpt:
     st.session_state.use_gpt = use_gpt
-    save_config({
-        'use_gpt': use_gpt,
-        'model_name': st.session_state.model_name,
-        'base_url': st.session_state.base_url,
-        'api_key': st.session_state.openai_api_key or "",
-        'system_prompt': st.session_state.system_prompt
-    })
+    st.session_state._config_dirty = True
 
 if use_gpt:
     # Model选择
@@ -241,13 +511,7 @@ if use_gpt:
     
     if model_name != st.session_state.model_name:
         st.session_state.model_name = model_name
-        save_config({
-            'use_gpt': use_gpt,
-            'model_name': model_name,
-            'base_url': st.session_state.base_url,
-            'api_key': st.session_state.openai_api_key or "",
-            'system_prompt': st.session_state.system_prompt
-        })
+        st.session_state._config_dirty = True
     
     # System Prompt输入
     system_prompt = st.sidebar.text_area(
@@ -257,13 +521,7 @@ if use_gpt:
     )
     if system_prompt != st.session_state.system_prompt:
         st.session_state.system_prompt = system_prompt
-        save_config({
-            'use_gpt': use_gpt,
-            'model_name': model_name,
-            'base_url': st.session_state.base_url,
-            'api_key': st.session_state.openai_api_key or "",
-            'system_prompt': system_prompt
-        })
+        st.session_state._config_dirty = True
     
     # Base URL输入
     base_url = st.sidebar.text_input(
@@ -272,13 +530,7 @@ if use_gpt:
     )
     if base_url != st.session_state.base_url:
         st.session_state.base_url = base_url
-        save_config({
-            'use_gpt': use_gpt,
-            'model_name': model_name,
-            'base_url': base_url,
-            'api_key': st.session_state.openai_api_key or "",
-            'system_prompt': st.session_state.system_prompt
-        })
+        st.session_state._config_dirty = True
     
     # API Key输入
     api_key = st.sidebar.text_input("OpenAI API Key", 
@@ -286,13 +538,7 @@ if use_gpt:
                                    type="password")
     if api_key != st.session_state.openai_api_key:
         st.session_state.openai_api_key = api_key
-        save_config({
-            'use_gpt': use_gpt,
-            'model_name': model_name,
-            'base_url': base_url,
-            'api_key': api_key,
-            'system_prompt': st.session_state.system_prompt
-        })
+        st.session_state._config_dirty = True
 
 # URL输入
 col1, col2 = st.columns([4, 1])
@@ -318,15 +564,20 @@ st.session_state.text_content = text_content
 # 整理文本按钮
 col1, col2 = st.columns([1, 5])
 if col1.button("整理文本"):
-    if text_content:
+    if text_content.strip():
         if use_gpt and st.session_state.openai_api_key:
-            with st.spinner("正在整理文本..."):
-                text_content = process_text_with_gpt(
-                    text_content,
-                    st.session_state.openai_api_key,
-                    st.session_state.model_name,
-                    st.session_state.base_url
-                )
+            try:
+                with st.spinner("正在整理文本..."):
+                    text_content = process_text_with_gpt(
+                        text_content,
+                        st.session_state.openai_api_key,
+                        st.session_state.model_name,
+                        st.session_state.base_url,
+                        st.session_state.system_prompt
+                    )
+            except Exception as e:
+                st.error(f"GPT处理失败: {str(e)}")
+            else:
                 # 更新文本编辑区
                 st.session_state.text_content = text_content
                 st.rerun()
@@ -354,30 +605,60 @@ selected_voice = st.selectbox("选择语音", voices)
 voice_id = selected_voice.split(" (")[0]
 
 # 生成音频按钮
-if st.button("生成音频"):
+col1, col2 = st.columns([1, 4])
+generate_clicked = col1.button("生成音频")
+pipeline_clicked = col2.button("整理并生成音频")
+
+if generate_clicked:
     if text_content:
         try:
             progress_placeholder = st.empty()
             
             # 生成音频
-            audio_file = asyncio.run(generate_audio(text_content, voice_id, progress_placeholder))
+            audio_bytes = asyncio.run(generate_audio(text_content, voice_id, progress_placeholder))
             
-            # 显示音频预览
-            with open(audio_file, 'rb') as f:
-                audio_bytes = f.read()
-                st.audio(audio_bytes, format='audio/mp3')
-                
-                # 下载按钮
-                st.download_button(
-                    label="下载MP3",
-                    data=audio_bytes,
-                    file_name="generated_audio.mp3",
-                    mime="audio/mpeg"
+            # 显示音频预览和下载按钮
+            show_audio(audio_bytes)
+        except Exception as e:
+            st.error(f"音频生成失败: {str(e)}")
+    else:
+        st.error("请先输入文本内容")
+elif pipeline_clicked:
+    if not text_content.strip():
+        st.error("请先输入文本内容")
+    elif use_gpt and st.session_state.openai_api_key:
+        try:
+            with st.spinner("正在整理文本并生成音频..."):
+                client = get_openai_client(
+                    st.session_state.openai_api_key,
+                    st.session_state.base_url
                 )
+                text_content, audio_bytes = run_async(process_and_generate_audio(
+                    client,
+                    text_content,
+                    voice_id,
+                    st.session_state.model_name,
+                    st.session_state.system_prompt
+                ))
+            # 更新文本编辑区（下次刷新时显示）
+            st.session_state.text_content = text_content
             
-            # 清理临时文件
-            os.unlink(audio_file)
+            # 显示音频预览和下载按钮
+            show_audio(audio_bytes)
         except Exception as e:
             st.error(f"音频生成失败: {str(e)}")
+    elif use_gpt:
+        st.warning("请在侧边栏输入OpenAI API Key")
     else:
-        st.error("请先输入文本内容")
\ No newline at end of file
+        st.warning("请在侧边栏启用GPT功能并完成相关配置")
+
+# 将本次刷新中修改的设置一次性写入配置文件
+if st.session_state._config_dirty:
+    maybe_save_config({
+        'use_gpt': st.session_state.use_gpt,
+        'model_name': st.session_state.model_name,
+        'base_url': st.session_state.base_url,
+        'api_key': st.session_state.openai_api_key or "",
+        'system_prompt': st.session_state.system_prompt
+    })
+    st.session_state._config_dirty = False